@@ -0,0 +1,108 @@
+import os
+import threading
+from functools import lru_cache, wraps
+
+import diskcache
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from openai import AzureOpenAI, AsyncAzureOpenAI
+
+# Azure Computer Vision
+from azure.cognitiveservices.vision.computervision import ComputerVisionClient
+from msrest.authentication import CognitiveServicesCredentials
+
+from config import (
+    MAX_WORKERS,
+    get_azure_cv_config,
+    get_azure_openai_config,
+    get_cache_dir,
+    get_confluence_credentials,
+)
+
+################################################################################
+# Lazily Constructed Clients and Sessions
+################################################################################
+
+def _lazy_client(factory):
+    """
+    Cache a client factory like lru_cache(maxsize=1), but build the client at most
+    once even when the first calls come from several worker threads at the same time.
+    """
+    cached_factory = lru_cache(maxsize=1)(factory)
+    lock = threading.Lock()
+
+    @wraps(factory)
+    def get_client():
+        with lock:
+            return cached_factory()
+    return get_client
+
+@_lazy_client
+def get_openai_client() -> AzureOpenAI:
+    """
+    Blocking Azure OpenAI client, used for single (streamed) summaries.
+    Retries are left to the tenacity policy in conf.py.
+    """
+    return AzureOpenAI(max_retries=0, **get_azure_openai_config())
+
+def new_async_openai_client() -> AsyncAzureOpenAI:
+    """
+    Fresh async Azure OpenAI client, used for running many summaries concurrently.
+    Not cached: its connection pool is bound to the event loop it first runs on, so
+    each summarize_many call opens (and closes) its own client.
+    Retries are left to the tenacity policy in conf.py.
+    """
+    return AsyncAzureOpenAI(max_retries=0, **get_azure_openai_config())
+
+@_lazy_client
+def get_cv_client() -> ComputerVisionClient:
+    """
+    Azure Computer Vision client. Only built once a page actually has images.
+    """
+    endpoint, key = get_azure_cv_config()
+    cv_client = ComputerVisionClient(endpoint, CognitiveServicesCredentials(key))
+    # Reuse one msrest session across describe calls instead of closing it after each request,
+    # and upload image streams in 64 KB blocks rather than msrest's 4 KB default
+    cv_client.config.keep_alive = True
+    cv_client.config.connection.data_block_size = 65536
+    return cv_client
+
+@_lazy_client
+def get_session() -> requests.Session:
+    """
+    Persistent requests session for Confluence calls.
+    """
+    session = requests.Session()
+    session.auth = get_confluence_credentials()
+    session.headers.update({"Content-Type": "application/json"})
+
+    # Keep enough warm keep-alive connections for every worker so concurrent calls to the
+    # Confluence host reuse TLS sessions instead of reconnecting (urllib3 only keeps
+    # 10 connections per host by default and discards the rest), and retry transient
+    # failures and throttling with backoff (honouring Retry-After)
+    adapter = HTTPAdapter(
+        pool_connections=MAX_WORKERS,
+        pool_maxsize=2 * MAX_WORKERS,
+        max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504]),
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+@_lazy_client
+def get_image_cache() -> diskcache.Cache:
+    """
+    Persistent cache of downloaded images, keyed on download link + attachment version
+    and tagged with the SHA-256 digest of the image bytes.
+    """
+    return diskcache.Cache(os.path.join(get_cache_dir(), "images"))
+
+@_lazy_client
+def get_caption_cache() -> diskcache.Cache:
+    """
+    Persistent cache of CV captions, keyed on the SHA-256 of the image bytes so logos
+    and screenshots reused across pages are only analyzed once. Kept in a sibling
+    directory of the image cache so clearing or culling one never touches the other.
+    """
+    return diskcache.Cache(os.path.join(get_cache_dir(), "captions"))
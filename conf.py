@@ -1,58 +1,74 @@
-import os
+import re
+import atexit
+import asyncio
+import json
+import math
+import hashlib
 import logging
-import requests
-import openai
-from io import BytesIO
+import threading
+import orjson
+from openai import RateLimitError
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_random_exponential
+from cachetools import TTLCache, cached
+from io import BytesIO, StringIO
 from bs4 import BeautifulSoup
+from selectolax.lexbor import LexborHTMLParser
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
-# Azure Computer Vision
-from azure.cognitiveservices.vision.computervision import ComputerVisionClient
-from azure.cognitiveservices.vision.computervision.models import VisualFeatureTypes
-from msrest.authentication import CognitiveServicesCredentials
+from config import (
+    CACHE_TTL,
+    CAPTION_CACHE_TTL,
+    CHARS_PER_TOKEN,
+    CONFLUENCE_BASE_URL,
+    CONTEXT_TARGET_TOKENS,
+    DEFAULT_TIMEOUT,
+    IMAGE_CHUNK_SIZE,
+    MAX_BATCH_CHARS,
+    MAX_PAGES,
+    MAX_WORKERS,
+    MIN_PAGE_TEXT_CHARS,
+    OPENAI_CONCURRENCY,
+    TITLE_MATCH_BONUS,
+    get_azure_openai_deployment_name,
+)
+from clients import (
+    get_caption_cache,
+    get_cv_client,
+    get_image_cache,
+    get_openai_client,
+    get_session,
+    new_async_openai_client,
+)
 
 ################################################################################
-# 1. Configuration and Environment Variable Validation
+# 1. Configuration
 ################################################################################
 
-def get_env_var(var_name: str) -> str:
-    value = os.environ.get(var_name)
-    if not value:
-        raise ValueError(f"Environment variable '{var_name}' is not set.")
-    return value
+# Environment-sourced settings and client construction live in config.py and
+# clients.py; both are initialized lazily on first use.
 
 # Logging configuration
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# === Azure OpenAI Configuration ===
-openai.api_type = "azure"
-openai.api_base = get_env_var("AZURE_OPENAI_ENDPOINT")        # e.g. "https://<your-resource>.openai.azure.com/"
-openai.api_version = get_env_var("AZURE_OPENAI_API_VERSION")    # e.g. "2023-05-15"
-openai.api_key = get_env_var("AZURE_OPENAI_API_KEY")            # your Azure OpenAI API key
-AZURE_OPENAI_DEPLOYMENT_NAME = get_env_var("AZURE_OPENAI_DEPLOYMENT_NAME")
-
-# === Azure Computer Vision Configuration ===
-AZURE_CV_ENDPOINT = get_env_var("AZURE_CV_ENDPOINT")            # e.g. "https://<your-cv-resource>.cognitiveservices.azure.com/"
-AZURE_CV_KEY = get_env_var("AZURE_CV_KEY")                      # your Computer Vision key
-
-# === Confluence Configuration ===
-CONFLUENCE_BASE_URL = "https://your-company.atlassian.net/wiki"  # Update if necessary
-CONFLUENCE_USERNAME = get_env_var("CONFLUENCE_USERNAME")
-CONFLUENCE_TOKEN = get_env_var("CONFLUENCE_TOKEN")  # Atlassian Cloud token or password
-
 ################################################################################
-# 2. Initialize Clients and Sessions
+# 2. Worker Pool and Caches
 ################################################################################
 
-# Initialize Azure Computer Vision client
-cv_client = ComputerVisionClient(AZURE_CV_ENDPOINT, CognitiveServicesCredentials(AZURE_CV_KEY))
+_IMG_EXTS = frozenset({"png", "jpg", "jpeg", "bmp", "gif", "svg"})  # attachment types sent to CV
+
+# Shared worker pool for Confluence I/O, HTML parsing and image analysis across all pages
+_IO_POOL = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="conf-io")
+atexit.register(_IO_POOL.shutdown, wait=True)
 
-# Create a persistent requests session for Confluence calls
-session = requests.Session()
-session.auth = (CONFLUENCE_USERNAME, CONFLUENCE_TOKEN)
-session.headers.update({"Content-Type": "application/json"})
-DEFAULT_TIMEOUT = 30  # seconds
+# In-memory caches for Confluence responses; attachment listings are keyed on the
+# page version so an edited page is fetched again
+_search_cache = TTLCache(maxsize=1024, ttl=CACHE_TTL)
+_attachment_cache = TTLCache(maxsize=1024, ttl=CACHE_TTL)
+_cache_lock = threading.Lock()
+
+# The persistent image and caption caches are opened on first use; see
+# get_image_cache() and get_caption_cache() in clients.py.
 
 ################################################################################
 # 3. Helper Functions
@@ -60,15 +76,25 @@ DEFAULT_TIMEOUT = 30  # seconds
 
 def html_to_text(html_content: str) -> str:
     """
-    Convert HTML content to plain text using BeautifulSoup.
+    Convert HTML content to plain text using selectolax (Lexbor backend), falling back to
+    BeautifulSoup if the document cannot be parsed. Script and style contents are
+    dropped, as are blank lines left by whitespace-only nodes.
     """
-    soup = BeautifulSoup(html_content, "html.parser")
-    return soup.get_text(separator="\n", strip=True)
+    try:
+        tree = LexborHTMLParser(html_content)
+        tree.strip_tags(["script", "style"])
+        node = tree.body if tree.body is not None else tree.root
+        text = node.text(separator="\n", strip=True) if node is not None else ""
+    except Exception as e:
+        logger.warning("selectolax failed to parse HTML, falling back to BeautifulSoup: %s", e)
+        soup = BeautifulSoup(html_content, "html.parser")
+        for tag in soup(["script", "style"]):
+            tag.decompose()
+        text = soup.get_text(separator="\n", strip=True)
+    return "\n".join(line for line in text.splitlines() if line.strip())
 
-def search_confluence(software_name: str) -> list:
-    """
-    Search Confluence for pages matching the given software/tool name using CQL.
-    """
+@cached(_search_cache, lock=_cache_lock)
+def _fetch_search_results(software_name: str) -> list:
     url = f"{CONFLUENCE_BASE_URL}/rest/api/content/search"
     cql_query = f'text ~ "{software_name}"'
     params = {
@@ -76,142 +102,557 @@ def search_confluence(software_name: str) -> list:
         "limit": 10,
         "expand": "body.view,metadata,version"
     }
+    logger.info("Searching Confluence for '%s'", software_name)
+    resp = get_session().get(url, params=params, timeout=DEFAULT_TIMEOUT)
+    resp.raise_for_status()
+    data = orjson.loads(resp.content)
+    return data.get("results", [])
+
+def search_confluence(software_name: str) -> list:
+    """
+    Search Confluence for pages matching the given software/tool name using CQL.
+    Results are cached for CACHE_TTL seconds.
+    """
     try:
-        logger.info("Searching Confluence for '%s'", software_name)
-        resp = session.get(url, params=params, timeout=DEFAULT_TIMEOUT)
-        resp.raise_for_status()
-        data = resp.json()
-        return data.get("results", [])
+        return _fetch_search_results(software_name)
     except Exception as e:
         logger.error("Error searching Confluence: %s", e)
         return []
 
-def get_page_attachments(page_id: str) -> list:
+@cached(_attachment_cache, lock=_cache_lock)
+def _fetch_attachments(page_id: str, version=None) -> list:
+    url = f"{CONFLUENCE_BASE_URL}/rest/api/content/{page_id}/child/attachment"
+    resp = get_session().get(url, params={"expand": "version"}, timeout=DEFAULT_TIMEOUT)
+    resp.raise_for_status()
+    data = orjson.loads(resp.content)
+    return data.get("results", [])
+
+def get_page_attachments(page_id: str, version=None) -> list:
     """
     Retrieve attachments from a Confluence page.
+    Listings are cached per (page_id, version) for CACHE_TTL seconds.
     """
-    url = f"{CONFLUENCE_BASE_URL}/rest/api/content/{page_id}/child/attachment"
     try:
-        resp = session.get(url, timeout=DEFAULT_TIMEOUT)
-        resp.raise_for_status()
-        data = resp.json()
-        return data.get("results", [])
+        return _fetch_attachments(page_id, version)
     except Exception as e:
         logger.error("Error retrieving attachments for page %s: %s", page_id, e)
         return []
 
-def analyze_image(image_bytes: bytes) -> str:
+def analyze_image(image_stream, digest: str) -> str:
+    """
+    Analyze an image stream using Azure Computer Vision to extract a description.
+    Captions are cached by the SHA-256 digest of the image bytes. The stream is
+    closed once analysis is done.
+    """
+    with image_stream:
+        caption = get_caption_cache().get(digest)
+        if caption is not None:
+            return caption
+        try:
+            description_result = get_cv_client().describe_image_in_stream(image_stream)
+            if description_result.captions:
+                caption = description_result.captions[0].text
+                get_caption_cache().set(digest, caption, expire=CAPTION_CACHE_TTL)
+                return caption
+            else:
+                return "No description available."
+        except Exception as e:
+            logger.error("Error analyzing image: %s", e)
+            return "Image analysis failed."
+
+def analyze_images_batch(images: list) -> list:
     """
-    Analyze an image using Azure Computer Vision to extract a description.
+    Analyze a batch of (digest, image_stream) pairs concurrently over the shared
+    CV connection pool. Returns one description per image, in input order.
     """
+    futures = [_IO_POOL.submit(analyze_image, image_stream, digest) for digest, image_stream in images]
+    return [future.result() for future in futures]
+
+# Back off and retry when Azure OpenAI rejects a request for exceeding RPM/TPM limits.
+# This is the only retry layer: the clients are built with the SDK's own retries off.
+_retry_on_rate_limit = retry(
+    retry=retry_if_exception_type(RateLimitError),
+    wait=wait_random_exponential(min=1, max=60),
+    stop=stop_after_attempt(6),
+    reraise=True,
+)
+
+@_retry_on_rate_limit
+def create_chat_completion(**kwargs):
+    return get_openai_client().chat.completions.create(model=get_azure_openai_deployment_name(), **kwargs)
+
+@_retry_on_rate_limit
+async def acreate_chat_completion(client, **kwargs):
+    return await client.chat.completions.create(
+        model=get_azure_openai_deployment_name(), **kwargs
+    )
+
+def summary_messages(text_content: str) -> list:
+    return [
+        {
+            "role": "system", 
+            "content": (
+                "You are an AI assistant that provides comprehensive summaries "
+                "of Confluence content and extracted data from images."
+            )
+        },
+        {
+            "role": "user", 
+            "content": (
+                "Here is the collected information about the software/tool. "
+                "Please write a detailed summary:\n" + text_content
+            )
+        }
+    ]
+
+def summarize_with_azure_openai_stream(text_content: str):
+    """
+    Use Azure OpenAI (Chat Completion) to generate a summary of the provided text,
+    yielding the summary text in chunks as they arrive.
+    """
+    if not text_content.strip():
+        yield "No content available to summarize."
+        return
+
     try:
-        description_result = cv_client.describe_image_in_stream(BytesIO(image_bytes))
-        if description_result.captions:
-            return description_result.captions[0].text
-        else:
-            return "No description available."
+        response = create_chat_completion(
+            messages=summary_messages(text_content),
+            temperature=0.0,
+            stream=True
+        )
+        for chunk in response:
+            # Azure sends content-filter results in chunks without choices
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                yield delta
     except Exception as e:
-        logger.error("Error analyzing image: %s", e)
-        return "Image analysis failed."
+        logger.error("Error during summarization with OpenAI: %s", e)
+        yield "An error occurred while generating the summary."
 
 def summarize_with_azure_openai(text_content: str) -> str:
     """
     Use Azure OpenAI (Chat Completion) to generate a summary of the provided text.
     """
+    return "".join(summarize_with_azure_openai_stream(text_content)).strip()
+
+async def summarize_with_azure_openai_async(client, text_content: str) -> str:
+    """
+    Async variant of summarize_with_azure_openai, for running many summaries concurrently
+    on the given AsyncAzureOpenAI client.
+    """
     if not text_content.strip():
         return "No content available to summarize."
-    
+
     try:
-        response = openai.ChatCompletion.create(
-            engine=AZURE_OPENAI_DEPLOYMENT_NAME,
-            messages=[
-                {
-                    "role": "system", 
-                    "content": (
-                        "You are an AI assistant that provides comprehensive summaries "
-                        "of Confluence content and extracted data from images."
-                    )
-                },
-                {
-                    "role": "user", 
-                    "content": (
-                        "Here is the collected information about the software/tool. "
-                        "Please write a detailed summary:\n" + text_content
-                    )
-                }
-            ],
+        response = await acreate_chat_completion(
+            client,
+            messages=summary_messages(text_content),
             temperature=0.0
         )
-        return response["choices"][0]["message"]["content"].strip()
+        return response.choices[0].message.content.strip()
     except Exception as e:
         logger.error("Error during summarization with OpenAI: %s", e)
         return "An error occurred while generating the summary."
 
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s+|\n+")
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were will with "
+    "you your we our can not".split()
+)
+
+# Lines written by collect_software_content that carry the page structure. Headers are
+# always kept; none of these lines are deduplicated, since their repeats belong to other pages.
+_PAGE_HEADER_PREFIXES = ("Page Title:", "Content:")
+_STRUCTURAL_PREFIXES = _PAGE_HEADER_PREFIXES + ("Image '",)
+
+def compress_context(text: str, target_tokens: int = CONTEXT_TARGET_TOKENS) -> str:
+    """
+    Shrink text to roughly target_tokens by keeping its most informative sentences.
+    Sentences are ranked by the mean TF-IDF of their content words (each sentence is
+    treated as a document) and kept in their original order; page title and content
+    header lines are always kept. If budget is left over, the best-ranked sentence
+    that did not fit is truncated to fill it, provided nothing else fit or at least
+    half of it does. Text already within budget is returned unchanged.
+    """
+    budget = target_tokens * CHARS_PER_TOKEN
+    if len(text) <= budget:
+        return text
+
+    # Exact repeats (navigation, footers) add nothing after the first occurrence
+    sentences = []
+    seen = set()
+    for sentence in _SENTENCE_SPLIT_RE.split(text):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        if not sentence.startswith(_STRUCTURAL_PREFIXES):
+            if sentence in seen:
+                continue
+            seen.add(sentence)
+        sentences.append(sentence)
+    sentence_words = [
+        [w for w in _WORD_RE.findall(s.lower()) if w not in _STOPWORDS] for s in sentences
+    ]
+    document_frequency = {}
+    for words in sentence_words:
+        for word in set(words):
+            document_frequency[word] = document_frequency.get(word, 0) + 1
+
+    n = len(sentences)
+    scores = []
+    for index, (sentence, words) in enumerate(zip(sentences, sentence_words)):
+        if sentence.startswith(_PAGE_HEADER_PREFIXES):
+            score = math.inf
+        elif words:
+            counts = {}
+            for word in words:
+                counts[word] = counts.get(word, 0) + 1
+            score = sum(
+                count / len(words) * math.log(n / document_frequency[word]) for word, count in counts.items()
+            ) / len(counts)
+        else:
+            score = 0.0
+        scores.append((score, index))
+
+    kept = {}
+    skipped = []
+    used = 0
+    kept_body = False
+    for score, index in sorted(scores, reverse=True):
+        length = len(sentences[index]) + 1
+        if used + length > budget and score != math.inf:
+            skipped.append(index)
+            continue
+        kept[index] = sentences[index]
+        used += length
+        kept_body = kept_body or score != math.inf
+    # Use the remaining budget for the start of the best sentence that was too long when
+    # nothing but headers fit (a single oversized sentence would otherwise leave nothing),
+    # or when at least half of that sentence fits; a shorter stub is just a fragment
+    remaining = budget - used - 1
+    if skipped and remaining > 0 and (
+        not kept_body or remaining * 2 >= len(sentences[skipped[0]])
+    ):
+        kept[skipped[0]] = sentences[skipped[0]][:remaining]
+        used = budget
+    logger.info("Compressed context from %d to %d characters", len(text), used)
+    return "\n".join(kept[index] for index in sorted(kept))
+
 ################################################################################
 # 4. Main Summarization Function
 ################################################################################
 
-def summarize_software(software_name: str) -> str:
+def is_stub_page(page: dict, plain_text: str, software_name: str) -> bool:
     """
-    Search for Confluence pages, extract their text and images, and summarize the combined content.
+    A stub page has almost no text and a title that does not mention the software name.
+    """
+    title_match = software_name.lower() in page.get("title", "").lower()
+    return len(plain_text) < MIN_PAGE_TEXT_CHARS and not title_match
+
+def page_score(page: dict, text_length: int, software_name: str) -> int:
     """
-    pages = search_confluence(software_name)
+    A page's relevance: its text length plus a bonus if its title mentions the software name.
+    """
+    title_match = software_name.lower() in page.get("title", "").lower()
+    return text_length + TITLE_MATCH_BONUS * title_match
+
+def select_relevant_pages(pages: list, page_texts: dict, software_name: str) -> list:
+    """
+    Drop stub pages and keep the MAX_PAGES most relevant ones (see page_score),
+    in search-result order. Ties go to the earlier search result.
+    """
+    scored = []
+    for index, page in enumerate(pages):
+        plain_text = page_texts[page.get("id")]
+        if is_stub_page(page, plain_text, software_name):
+            continue
+        scored.append((page_score(page, len(plain_text), software_name), index, page))
+    top = sorted(scored, key=lambda item: item[0], reverse=True)[:MAX_PAGES]
+    return [page for _, _, page in sorted(top, key=lambda item: item[1])]
+
+def _certain_top_pages(pages: list, page_texts: dict, software_name: str) -> list:
+    """
+    Pages that select_relevant_pages is guaranteed to keep, whatever the text of the
+    pages still being parsed turns out to be. An unparsed page's text can be no longer
+    than its HTML, which bounds the score it can reach.
+    """
+    bounds = []
+    for index, page in enumerate(pages):
+        plain_text = page_texts.get(page.get("id"))
+        if plain_text is None:
+            html_length = len(page.get("body", {}).get("view", {}).get("value", ""))
+            bounds.append((False, page_score(page, html_length, software_name), index))
+        elif not is_stub_page(page, plain_text, software_name):
+            bounds.append((True, page_score(page, len(plain_text), software_name), index))
+
+    certain = []
+    for known, score, index in bounds:
+        if not known:
+            continue
+        # Pages that could rank ahead of this one: higher score, or equal score and earlier
+        rivals = sum(
+            1 for _, other_score, other_index in bounds
+            if other_score > score or (other_score == score and other_index < index)
+        )
+        if rivals < MAX_PAGES:
+            certain.append(pages[index])
+    return certain
+
+def collect_software_content(software_name: str):
+    """
+    Search for Confluence pages and combine their text and image descriptions.
+    Returns None if no relevant pages were found.
+    """
+    # Search results can repeat a page; keep the first occurrence of each id
+    pages = []
+    seen_ids = set()
+    for page in search_confluence(software_name):
+        if page.get("id") not in seen_ids:
+            seen_ids.add(page.get("id"))
+            pages.append(page)
     if not pages:
-        return f"No Confluence pages found for '{software_name}'."
-    
-    combined_text_parts = []
+        return None
+
+    # Convert HTML for every page on the shared pool. As soon as a page is certain to
+    # make the MAX_PAGES cut, start listing its attachments so the listing overlaps
+    # with the parsing of the remaining pages.
+    page_texts = {}
+    text_tasks = {}
+    attachment_futures = {}
+
+    def submit_attachment_listings(selected):
+        for page in selected:
+            page_id = page.get("id")
+            if page_id not in attachment_futures:
+                page_version = page.get("version", {}).get("number")
+                attachment_futures[page_id] = _IO_POOL.submit(get_page_attachments, page_id, page_version)
 
-    # Process each page
+    for page in pages:
+        page_body_html = page.get("body", {}).get("view", {}).get("value", "")
+        text_tasks[_IO_POOL.submit(html_to_text, page_body_html)] = page
+    for future in as_completed(text_tasks):
+        page_texts[text_tasks[future].get("id")] = future.result()
+        submit_attachment_listings(_certain_top_pages(pages, page_texts, software_name))
+
+    # Keep the most relevant pages; only these ever get their attachments listed
+    pages = select_relevant_pages(pages, page_texts, software_name)
+    if not pages:
+        return None
+    submit_attachment_listings(pages)
+
+    # Per page: attachment index -> (title, description), so images are written in
+    # attachment order whatever order their downloads and analysis finish in
+    image_descriptions = {page.get("id"): {} for page in pages}
+    attachment_tasks = {attachment_futures[page.get("id")]: page.get("id") for page in pages}
+
+    # As attachment lists come back, submit image downloads onto the same pool
+    download_tasks = {}
+    for future in as_completed(attachment_tasks):
+        page_id = attachment_tasks[future]
+        for att_index, att in enumerate(future.result()):
+            filename = att.get("title", "")
+            if "." in filename and filename.rsplit(".", 1)[-1].lower() in _IMG_EXTS:
+                download_link = att.get("_links", {}).get("download", "")
+                if download_link and not download_link.startswith("http"):
+                    download_link = f"{CONFLUENCE_BASE_URL}{download_link}"
+                # Stage 1: download the image bytes
+                download_future = _IO_POOL.submit(
+                    download_image, download_link, att.get("title"), att.get("version", {}).get("number")
+                )
+                download_tasks[download_future] = (page_id, att_index, att.get("title"))
+
+    # Collect downloaded images
+    downloaded = []
+    for future in as_completed(download_tasks):
+        page_id, att_index, image_title = download_tasks[future]
+        image = future.result()
+        if image is None:
+            image_descriptions[page_id][att_index] = (image_title, f"Failed to analyze image '{image_title}'.")
+        else:
+            downloaded.append((page_id, att_index, image_title, image))
+
+    # Stage 2: hand every downloaded image to the CV batch in one go, in page and
+    # attachment order so the batch does not depend on which download finished first
+    page_order = {page.get("id"): position for position, page in enumerate(pages)}
+    downloaded.sort(key=lambda item: (page_order[item[0]], item[1]))
+    captions = analyze_images_batch([image for _, _, _, image in downloaded])
+    for (page_id, att_index, image_title, _), image_description in zip(downloaded, captions):
+        if image_description:
+            image_descriptions[page_id][att_index] = (image_title, image_description)
+
+    # Assemble the combined text in search-result order so the prompt is deterministic.
+    # Only this thread writes to the buffer; workers just return their fragments.
+    buf = StringIO()
     for page in pages:
         page_id = page.get("id")
         page_title = page.get("title", "Untitled")
-        page_body_html = page.get("body", {}).get("view", {}).get("value", "")
-        plain_text = html_to_text(page_body_html)
-        combined_text_parts.append(f"Page Title: {page_title}\n\nContent:\n{plain_text}\n")
-        
-        attachments = get_page_attachments(page_id)
-        # Process image attachments concurrently
-        image_tasks = {}
-        with ThreadPoolExecutor(max_workers=5) as executor:
-            for att in attachments:
-                filename = att.get("title", "").lower()
-                if filename.endswith((".png", ".jpg", ".jpeg", ".bmp", ".gif", ".svg")):
-                    download_link = att.get("_links", {}).get("download", "")
-                    if download_link and not download_link.startswith("http"):
-                        download_link = f"{CONFLUENCE_BASE_URL}{download_link}"
-                    # Submit a task to download and analyze the image
-                    future = executor.submit(download_and_analyze_image, download_link, att.get("title"))
-                    image_tasks[future] = att.get("title")
-            
-            # Collect image analysis results
-            for future in as_completed(image_tasks):
-                image_title = image_tasks[future]
-                try:
-                    image_description = future.result()
-                    if image_description:
-                        combined_text_parts.append(
-                            f"Image '{image_title}' described as: {image_description}"
-                        )
-                except Exception as e:
-                    logger.error("Error processing image '%s': %s", image_title, e)
-    
-    # Combine all text for summarization
-    big_content = "\n\n".join(combined_text_parts)
+        buf.write(f"Page Title: {page_title}\n\nContent:\n{page_texts[page_id]}\n")
+        buf.write("\n\n")
+        for _, (image_title, image_description) in sorted(image_descriptions[page_id].items()):
+            buf.write(f"Image '{image_title}' described as: {image_description}")
+            buf.write("\n\n")
+
+    # Combine all text for summarization, trimmed to the token budget
+    return compress_context(buf.getvalue())
+
+def summarize_software_stream(software_name: str):
+    """
+    Search for Confluence pages, extract their text and images, and stream a summary
+    of the combined content in chunks as it is generated.
+    """
+    big_content = collect_software_content(software_name)
+    if big_content is None:
+        yield f"No Confluence pages found for '{software_name}'."
+        return
     logger.info("Sending combined content to Azure OpenAI for summarization...")
-    final_summary = summarize_with_azure_openai(big_content)
-    return final_summary
+    yield from summarize_with_azure_openai_stream(big_content)
+
+def summarize_software(software_name: str) -> str:
+    """
+    Search for Confluence pages, extract their text and images, and summarize the combined content.
+    """
+    return "".join(summarize_software_stream(software_name)).strip()
+
+async def summarize_batch_with_azure_openai(client, contents: dict) -> dict:
+    """
+    Summarize several tools' collected content in a single Chat Completion on the
+    given AsyncAzureOpenAI client.
+    Takes a mapping of tool name -> content and returns tool name -> summary.
+    Tools the reply leaves out (or returns a non-string for) are summarized individually.
+    """
+    labels = {f"tool_{i}": name for i, name in enumerate(contents, start=1)}
+    sections = [
+        f"==={label.upper()}===\n{contents[name]}" for label, name in labels.items()
+    ]
+    try:
+        response = await acreate_chat_completion(
+            client,
+            messages=[
+                {
+                    "role": "system",
+                    "content": (
+                        "You are an AI assistant that provides comprehensive summaries "
+                        "of Confluence content and extracted data from images. "
+                        "The user message contains collected information about several "
+                        "software tools, each under a labeled delimiter such as ===TOOL_1===. "
+                        "Write a detailed summary for each tool and return JSON: "
+                        + json.dumps({label: "..." for label in labels})
+                    )
+                },
+                {
+                    "role": "user",
+                    "content": "\n\n".join(sections)
+                }
+            ],
+            temperature=0.0,
+            response_format={"type": "json_object"}
+        )
+        summaries = json.loads(response.choices[0].message.content)
+        if not isinstance(summaries, dict):
+            raise ValueError(f"expected a JSON object, got {type(summaries).__name__}")
+    except Exception as e:
+        logger.error("Error during batched summarization with OpenAI: %s", e)
+        fallback = await asyncio.gather(
+            *(summarize_with_azure_openai_async(client, contents[name]) for name in labels.values())
+        )
+        return dict(zip(labels.values(), fallback))
+
+    results = {}
+    retry_names = []
+    for label, name in labels.items():
+        summary = summaries.get(label)
+        if isinstance(summary, str) and summary.strip():
+            results[name] = summary.strip()
+        else:
+            retry_names.append(name)
+    if retry_names:
+        # Summarize only the tools the batched reply left out, one call each
+        logger.warning(
+            "Batched summary missing or malformed for %s; summarizing them individually",
+            ", ".join(retry_names),
+        )
+        fallback = await asyncio.gather(
+            *(summarize_with_azure_openai_async(client, contents[name]) for name in retry_names)
+        )
+        results.update(zip(retry_names, fallback))
+    return {name: results[name] for name in labels.values()}
+
+async def summarize_many(tools: list, concurrency: int = OPENAI_CONCURRENCY) -> dict:
+    """
+    Summarize several software tools, packing their content into as few
+    Chat Completion calls as MAX_BATCH_CHARS allows and running up to
+    `concurrency` of those calls at once. Run with asyncio.run(summarize_many(tools)).
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    loop = asyncio.get_running_loop()
+
+    async def collect(name):
+        # Collection blocks on the shared worker pool, so run it off the event loop
+        # (on the default executor, never on the pool it waits on)
+        async with semaphore:
+            return await loop.run_in_executor(None, collect_software_content, name)
+
+    contents = await asyncio.gather(*(collect(name) for name in tools))
+
+    results = {}
+    batches = []
+    batch, batch_chars = {}, 0
+    for name, big_content in zip(tools, contents):
+        if big_content is None:
+            results[name] = f"No Confluence pages found for '{name}'."
+            continue
+        if batch and batch_chars + len(big_content) > MAX_BATCH_CHARS:
+            batches.append(batch)
+            batch, batch_chars = {}, 0
+        batch[name] = big_content
+        batch_chars += len(big_content)
+    if batch:
+        batches.append(batch)
+
+    async def summarize(client, batch):
+        async with semaphore:
+            logger.info("Summarizing %d tool(s) in one Azure OpenAI call...", len(batch))
+            if len(batch) == 1:
+                name, big_content = next(iter(batch.items()))
+                return {name: await summarize_with_azure_openai_async(client, big_content)}
+            return await summarize_batch_with_azure_openai(client, batch)
+
+    if batches:
+        # One client per call: an async client cannot be reused once its event loop closes
+        async with new_async_openai_client() as client:
+            for batch_results in await asyncio.gather(*(summarize(client, batch) for batch in batches)):
+                results.update(batch_results)
+    return {name: results[name] for name in tools}
 
-def download_and_analyze_image(download_link: str, image_title: str) -> str:
+def download_image(download_link: str, image_title: str, version=None):
     """
-    Download an image from the provided link and return its description using CV analysis.
+    Stream an image from the provided link into a single buffer, hashing it as
+    chunks arrive. Returns (sha256 digest, file-like image) or None on failure.
+    Downloads are cached on disk per (download_link, version).
     """
+    cache_key = (download_link, version)
+    image_stream, digest = get_image_cache().get(cache_key, read=True, tag=True)
+    if image_stream is not None:
+        return digest, image_stream
     try:
-        response = session.get(download_link, timeout=DEFAULT_TIMEOUT)
-        response.raise_for_status()
-        return analyze_image(response.content)
+        hasher = hashlib.sha256()
+        image_stream = BytesIO()
+        with get_session().get(download_link, stream=True, timeout=DEFAULT_TIMEOUT) as response:
+            response.raise_for_status()
+            for chunk in response.iter_content(chunk_size=IMAGE_CHUNK_SIZE):
+                hasher.update(chunk)
+                image_stream.write(chunk)
+        digest = hasher.hexdigest()
+        image_stream.seek(0)
+        get_image_cache().set(cache_key, image_stream, read=True, tag=digest)
+        image_stream.seek(0)
+        return digest, image_stream
     except Exception as e:
         logger.error("Error downloading image '%s': %s", image_title, e)
-        return f"Failed to analyze image '{image_title}'."
+        return None
 
 ################################################################################
 # 5. CLI / Driver Code
@@ -221,6 +662,7 @@ if __name__ == "__main__":
     # Example usage: replace "MyCoolSoftware" with your search term
     software_tool_name = "MyCoolSoftware"
     logger.info("Summarizing data for '%s' from Confluence...", software_tool_name)
-    summary = summarize_software(software_tool_name)
     print("----- COMPREHENSIVE SUMMARY -----")
-    print(summary)
+    for chunk in summarize_software_stream(software_tool_name):
+        print(chunk, end="", flush=True)
+    print()
@@ -0,0 +1,83 @@
+import os
+from functools import lru_cache
+
+################################################################################
+# Environment Variable Validation
+################################################################################
+
+def get_env_var(var_name: str) -> str:
+    value = os.environ.get(var_name)
+    if not value:
+        raise ValueError(f"Environment variable '{var_name}' is not set.")
+    return value
+
+################################################################################
+# Environment-sourced Settings (read and validated on first use)
+################################################################################
+
+@lru_cache(maxsize=1)
+def get_azure_openai_config() -> dict:
+    """
+    Connection settings for the Azure OpenAI clients.
+    """
+    return {
+        "azure_endpoint": get_env_var("AZURE_OPENAI_ENDPOINT"),  # e.g. "https://<your-resource>.openai.azure.com/"
+        "api_version": get_env_var("AZURE_OPENAI_API_VERSION"),  # e.g. "2024-02-01"
+        "api_key": get_env_var("AZURE_OPENAI_API_KEY"),          # your Azure OpenAI API key
+    }
+
+@lru_cache(maxsize=1)
+def get_azure_openai_deployment_name() -> str:
+    return get_env_var("AZURE_OPENAI_DEPLOYMENT_NAME")
+
+@lru_cache(maxsize=1)
+def get_azure_cv_config() -> tuple:
+    """
+    (endpoint, key) for Azure Computer Vision.
+    """
+    return (
+        get_env_var("AZURE_CV_ENDPOINT"),  # e.g. "https://<your-cv-resource>.cognitiveservices.azure.com/"
+        get_env_var("AZURE_CV_KEY"),       # your Computer Vision key
+    )
+
+@lru_cache(maxsize=1)
+def get_confluence_credentials() -> tuple:
+    """
+    (username, token) for Confluence; the token is an Atlassian Cloud token or password.
+    """
+    return get_env_var("CONFLUENCE_USERNAME"), get_env_var("CONFLUENCE_TOKEN")
+
+@lru_cache(maxsize=1)
+def get_cache_dir() -> str:
+    return os.environ.get("CONFLUENCE_CACHE_DIR", ".confluence_cache")  # on-disk image cache
+
+################################################################################
+# Static Settings
+################################################################################
+
+# === Azure OpenAI ===
+# Maximum number of Chat Completion requests summarize_many keeps in flight
+OPENAI_CONCURRENCY = 8
+# Upper bound on collected content per batched summarization call (~12k tokens at ~4 chars/token)
+MAX_BATCH_CHARS = 48000
+
+# === Page Selection ===
+MAX_PAGES = 5  # most relevant search results kept per software/tool
+MIN_PAGE_TEXT_CHARS = 100  # pages shorter than this are dropped unless the title matches
+TITLE_MATCH_BONUS = 500  # relevance bonus for pages whose title contains the search term
+
+# === Context Compression ===
+CONTEXT_TARGET_TOKENS = 6000  # approximate token budget for one tool's collected content
+CHARS_PER_TOKEN = 4
+
+# === Confluence ===
+CONFLUENCE_BASE_URL = "https://your-company.atlassian.net/wiki"  # Update if necessary
+DEFAULT_TIMEOUT = 30  # seconds
+IMAGE_CHUNK_SIZE = 64 * 1024  # bytes read per chunk when streaming image downloads
+
+# === Concurrency ===
+MAX_WORKERS = 32  # shared worker pool size for Confluence I/O, HTML parsing and image analysis
+
+# === Caching ===
+CACHE_TTL = 300  # seconds to keep Confluence search results and attachment listings
+CAPTION_CACHE_TTL = 86400 * 30  # seconds to keep CV captions, keyed on image content
@@ -1,74 +1,340 @@
 import os
-from langchain.chat_models import AzureChatOpenAI
-from langchain.prompts import PromptTemplate
-from langchain.chains import LLMChain
+import json
+import logging
+from openai import AzureOpenAI
+
+logger = logging.getLogger(__name__)
+
+# Worked examples shared by the classification prompts, as
+# (query, category, missing, verification outcome). Together with the instructions they
+# keep each static system prompt above the 1024-token minimum for Azure OpenAI's
+# automatic prompt cache; keep them that long when editing.
+CLASSIFICATION_EXAMPLES = [
+    (
+        "I forgot my password for the HR portal, my username is jdoe.",
+        "Password Reset", "None", "Verified",
+    ),
+    (
+        "Please reset my password.",
+        "Password Reset", "Username or account the password is for",
+        "Missing the username or account the password is for",
+    ),
+    (
+        "My Windows login password expired this morning and I cannot sign in. Employee ID 48213, account a.khan.",
+        "Password Reset", "None", "Verified",
+    ),
+    (
+        "I locked myself out of the expense system after too many attempts.",
+        "Password Reset", "Username for the expense system",
+        "Missing the username for the expense system",
+    ),
+    (
+        "I need a new password for my email account mlopez@company.com, I think it was compromised.",
+        "Password Reset", "None", "Verified",
+    ),
+    (
+        "Can you reset the password on the shared finance mailbox? I am the mailbox owner, user rtanaka.",
+        "Password Reset", "None", "Verified",
+    ),
+    (
+        "Reset my VPN token PIN, it keeps rejecting me.",
+        "Password Reset", "Username or employee ID for the VPN account",
+        "Missing the username or employee ID for the VPN account",
+    ),
+    (
+        "My VDI machine VDI-0421 needs 16 GB of RAM instead of 8 GB for data processing.",
+        "VDI Resource Increase", "None", "Verified",
+    ),
+    (
+        "My virtual desktop is too slow, can I get more resources?",
+        "VDI Resource Increase", "VDI machine name and the resources required (CPU, RAM or disk)",
+        "Missing the VDI machine name and the resources required (CPU, RAM or disk)",
+    ),
+    (
+        "Please add 200 GB of disk to VDI-1187, the build cache fills the current 100 GB drive every week.",
+        "VDI Resource Increase", "None", "Verified",
+    ),
+    (
+        "I need 8 vCPUs on my virtual desktop for the new simulation models.",
+        "VDI Resource Increase", "VDI machine name",
+        "Missing the VDI machine name",
+    ),
+    (
+        "Increase VDI-0930 from 4 to 8 cores and from 16 to 32 GB of memory for the analytics project.",
+        "VDI Resource Increase", "None", "Verified",
+    ),
+    (
+        "Can my VDI get a GPU? The machine is VDI-2210.",
+        "VDI Resource Increase", "The GPU type or amount of GPU memory required",
+        "Missing the GPU type or amount of GPU memory required",
+    ),
+    (
+        "VDI-0512 runs out of memory when I open large spreadsheets, please double its RAM.",
+        "VDI Resource Increase", "None", "Verified",
+    ),
+    (
+        "The printer on the 3rd floor near room 310 shows a paper jam error.",
+        "Other IT Support", "None", "Verified",
+    ),
+    (
+        "Something is broken.",
+        "Other IT Support", "Description of the system affected and the problem observed",
+        "Missing a description of the system affected and the problem observed",
+    ),
+    (
+        "Outlook crashes every time I open a calendar invite on my laptop LT-7781.",
+        "Other IT Support", "None", "Verified",
+    ),
+    (
+        "I need Visual Studio Code installed on my workstation WS-3320 for the onboarding course.",
+        "Other IT Support", "None", "Verified",
+    ),
+    (
+        "The Wi-Fi keeps dropping.",
+        "Other IT Support", "Location or building and the device affected",
+        "Missing the location or building and the device affected",
+    ),
+    (
+        "My second monitor stopped working after the docking station firmware update on laptop LT-2043.",
+        "Other IT Support", "None", "Verified",
+    ),
+    (
+        "Please give me access to the marketing SharePoint site, my manager is J. Osei and approved it.",
+        "Other IT Support", "None", "Verified",
+    ),
+    (
+        "My password for the ticketing system stopped working after I changed it yesterday, username pwhite.",
+        "Password Reset", "None", "Verified",
+    ),
+    (
+        "I am a new starter and never received my initial network password, my employee ID is 55102.",
+        "Password Reset", "None", "Verified",
+    ),
+    (
+        "Need a password reset urgently, I have a client demo in ten minutes.",
+        "Password Reset", "Username or account the password is for",
+        "Missing the username or account the password is for",
+    ),
+    (
+        "Please unlock and reset the password for the service account svc-reporting used by the nightly reports job.",
+        "Password Reset", "None", "Verified",
+    ),
+    (
+        "The data science team needs VDI-0777 upgraded to 64 GB of RAM for model training next sprint.",
+        "VDI Resource Increase", "None", "Verified",
+    ),
+    (
+        "My VDI keeps running out of space.",
+        "VDI Resource Increase", "VDI machine name and the amount of disk space required",
+        "Missing the VDI machine name and the amount of disk space required",
+    ),
+    (
+        "Please add two more CPU cores to VDI-3051, compiling the mobile app takes over an hour.",
+        "VDI Resource Increase", "None", "Verified",
+    ),
+    (
+        "VDI-1420 needs more memory.",
+        "VDI Resource Increase", "The amount of memory required",
+        "Missing the amount of memory required",
+    ),
+    (
+        "Teams shows 'We couldn't connect you' on my laptop LT-5519 since this morning, other apps work fine.",
+        "Other IT Support", "None", "Verified",
+    ),
+    (
+        "My laptop is making a loud noise.",
+        "Other IT Support", "Laptop asset tag and a description of when the noise happens",
+        "Missing the laptop asset tag and a description of when the noise happens",
+    ),
+    (
+        "The projector in meeting room 4B does not detect any HDMI input from laptops.",
+        "Other IT Support", "None", "Verified",
+    ),
+    (
+        "Please install the Tableau Desktop license on workstation WS-1102, the purchase order is PO-88341.",
+        "Other IT Support", "None", "Verified",
+    ),
+    (
+        "I can't log in to the payroll portal anymore, it says my password is wrong. My username is kbrandt.",
+        "Password Reset", "None", "Verified",
+    ),
+    (
+        "Please resize VDI-2675 to the large profile (8 vCPU, 32 GB RAM) for the reporting migration.",
+        "VDI Resource Increase", "None", "Verified",
+    ),
+    (
+        "The badge reader at the side entrance of building C rejects every card since the power cut.",
+        "Other IT Support", "None", "Verified",
+    ),
+]
+
+def _render_examples(render) -> str:
+    return "\n\n".join(
+        f"User Query: {query}\n{render(category, missing, verification)}"
+        for query, category, missing, verification in CLASSIFICATION_EXAMPLES
+    )
+
+# Static classification instructions and worked examples. Kept identical across calls
+# and sent ahead of the user query so Azure OpenAI's prompt cache can reuse the prefix.
+CLASSIFICATION_SYSTEM_PROMPT = (
+    "You are a help desk planning and routing agent. Analyze the user query and classify "
+    "the request into one of these categories: 'Password Reset', 'VDI Resource Increase', or 'Other IT Support'.\n"
+    "Also, identify any missing information required to process the request. Return your answer in the format:\n\n"
+    "Category: <category>\nMissing: <missing details or 'None'>\n\n"
+    "Examples:\n\n"
+    + _render_examples(lambda category, missing, _: f"Category: {category}\nMissing: {missing}")
+)
+
+# Static instructions for the combined classification + verification call.
+CLASSIFY_AND_VERIFY_SYSTEM_PROMPT = (
+    "You are a help desk planning, routing and verification agent. Analyze the user query and classify "
+    "the request into one of these categories: 'Password Reset', 'VDI Resource Increase', or 'Other IT Support'.\n"
+    "Identify any missing information required to process the request, then verify that the request "
+    "contains all the necessary information for its category.\n"
+    "Return JSON with keys category, missing, verification_outcome:\n"
+    "- category: one of the categories above\n"
+    "- missing: the missing details, or 'None'\n"
+    "- verification_outcome: 'Verified' if the request is complete, otherwise list what is missing\n\n"
+    "Examples:\n\n"
+    + _render_examples(
+        lambda category, missing, verification: json.dumps(
+            {"category": category, "missing": missing, "verification_outcome": verification}
+        )
+    )
+)
+
+FINAL_SUMMARY_SYSTEM_PROMPT = (
+    "You are a help desk final summary agent. Based on the following information, generate a final summary "
+    "report for the user that outlines the original request, the classification, the verification outcome, and "
+    "the resolution details."
+)
+FINAL_SUMMARY_USER_PROMPT = (
+    "User Query: {query}\n"
+    "Category: {category}\n"
+    "Verification Outcome: {verification}\n"
+    "Resolution Details: {resolution}\n\n"
+    "Final Summary Report:"
+)
+
+VERIFICATION_SYSTEM_PROMPT = (
+    "You are a help desk verification agent. Verify that the request contains all the necessary information "
+    "for its category. If any required information is missing, list it; otherwise, reply with 'Verified'."
+)
+VERIFICATION_USER_PROMPT = (
+    "Category: {category}\n"
+    "Request Details: {details}\n\n"
+    "Verification Outcome:"
+)
+
+
+def chat_completion(client: AzureOpenAI, deployment_name: str, messages: list, temperature: float, **kwargs) -> str:
+    """
+    Call Azure OpenAI Chat Completion directly and return the stripped reply text.
+    """
+    response = client.chat.completions.create(
+        model=deployment_name, messages=messages, temperature=temperature, **kwargs
+    )
+    usage = response.usage
+    if usage is not None:
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached_tokens = getattr(details, "cached_tokens", None)
+        logger.info("Prompt tokens: %s (cached: %s)", usage.prompt_tokens, cached_tokens)
+    return response.choices[0].message.content.strip()
+
+
+def chat_completion_stream(client: AzureOpenAI, deployment_name: str, messages: list, temperature: float, **kwargs):
+    """
+    Call Azure OpenAI Chat Completion with streaming and yield the reply text in chunks.
+    """
+    response = client.chat.completions.create(
+        model=deployment_name, messages=messages, temperature=temperature, stream=True, **kwargs
+    )
+    for chunk in response:
+        # Azure sends content-filter results in chunks without choices
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if delta:
+            yield delta
+
 
 # ================================================================
 # Planning & Routing Agent: Classifies the query and later provides a final summary.
 # ================================================================
 class PlanningRoutingAgent:
-    def __init__(self, llm):
-        self.llm = llm
-        # Prompt to classify the query and check for missing details.
-        self.classification_prompt = PromptTemplate(
-            input_variables=["query"],
-            template=(
-                "You are a help desk planning and routing agent. Analyze the following user query and classify "
-                "the request into one of these categories: 'Password Reset', 'VDI Resource Increase', or 'Other IT Support'.\n"
-                "Also, identify any missing information required to process the request. Return your answer in the format:\n\n"
-                "Category: <category>\nMissing: <missing details or 'None'>\n\n"
-                "User Query: {query}"
-            )
-        )
-        self.classification_chain = LLMChain(llm=self.llm, prompt=self.classification_prompt)
-
-        # Prompt to generate the final summary for the user.
-        self.final_summary_prompt = PromptTemplate(
-            input_variables=["query", "category", "verification", "resolution"],
-            template=(
-                "You are a help desk final summary agent. Based on the following information, generate a final summary "
-                "report for the user that outlines the original request, the classification, the verification outcome, and "
-                "the resolution details.\n\n"
-                "User Query: {query}\n"
-                "Category: {category}\n"
-                "Verification Outcome: {verification}\n"
-                "Resolution Details: {resolution}\n\n"
-                "Final Summary Report:"
-            )
-        )
-        self.final_summary_chain = LLMChain(llm=self.llm, prompt=self.final_summary_prompt)
+    def __init__(self, client: AzureOpenAI, deployment_name: str, temperature: float = 0.2):
+        self.client = client
+        self.deployment_name = deployment_name
+        self.temperature = temperature
+        # Static system messages, built once and reused for every query.
+        self._classification_messages = [
+            {"role": "system", "content": CLASSIFICATION_SYSTEM_PROMPT},
+            {"role": "user", "content": None},
+        ]
+        self._classify_and_verify_messages = [
+            {"role": "system", "content": CLASSIFY_AND_VERIFY_SYSTEM_PROMPT},
+            {"role": "user", "content": None},
+        ]
+        self._final_summary_messages = [
+            {"role": "system", "content": FINAL_SUMMARY_SYSTEM_PROMPT},
+            {"role": "user", "content": None},
+        ]
+
+    @staticmethod
+    def _build_messages(messages_template: list, user_content: str) -> list:
+        messages = messages_template.copy()
+        messages[1] = {"role": "user", "content": user_content}
+        return messages
+
+    def _run(self, messages_template: list, user_content: str, **kwargs) -> str:
+        messages = self._build_messages(messages_template, user_content)
+        return chat_completion(self.client, self.deployment_name, messages, self.temperature, **kwargs)
 
     def process_query(self, query: str) -> str:
-        response = self.classification_chain.run(query=query)
-        return response.strip()
+        return self._run(self._classification_messages, f"User Query: {query}")
 
-    def generate_final_summary(self, query: str, category: str, verification: str, resolution: str) -> str:
-        summary = self.final_summary_chain.run(
-            query=query, category=category, verification=verification, resolution=resolution
+    def classify_and_verify(self, query: str) -> str:
+        """
+        Classify and verify the query in a single call. Returns the raw JSON reply.
+        """
+        return self._run(
+            self._classify_and_verify_messages, f"User Query: {query}", response_format={"type": "json_object"}
         )
-        return summary.strip()
+
+    def generate_final_summary_stream(self, query: str, category: str, verification: str, resolution: str):
+        """
+        Stream the final summary report in chunks as they are generated.
+        """
+        messages = self._build_messages(
+            self._final_summary_messages,
+            FINAL_SUMMARY_USER_PROMPT.format(
+                query=query, category=category, verification=verification, resolution=resolution
+            ),
+        )
+        yield from chat_completion_stream(self.client, self.deployment_name, messages, self.temperature)
+
+    def generate_final_summary(self, query: str, category: str, verification: str, resolution: str) -> str:
+        return "".join(self.generate_final_summary_stream(query, category, verification, resolution)).strip()
 
 
 # ================================================================
 # Verification Agent: Ensures the request details are complete (single check).
+# Used as a fallback when the combined classify-and-verify reply cannot be parsed.
 # ================================================================
 class VerificationAgent:
-    def __init__(self, llm):
-        self.llm = llm
-        self.verification_prompt = PromptTemplate(
-            input_variables=["details", "category"],
-            template=(
-                "You are a help desk verification agent. Verify that the following request, categorized as '{category}', "
-                "contains all the necessary information. If any required information is missing, list it; otherwise, reply with 'Verified'.\n\n"
-                "Request Details: {details}\n\n"
-                "Verification Outcome:"
-            )
-        )
-        self.verification_chain = LLMChain(llm=self.llm, prompt=self.verification_prompt)
+    def __init__(self, client: AzureOpenAI, deployment_name: str, temperature: float = 0.2):
+        self.client = client
+        self.deployment_name = deployment_name
+        self.temperature = temperature
+        self._verification_messages = [
+            {"role": "system", "content": VERIFICATION_SYSTEM_PROMPT},
+            {"role": "user", "content": None},
+        ]
 
     def verify_request(self, details: str, category: str) -> str:
-        response = self.verification_chain.run(details=details, category=category)
-        return response.strip()
+        messages = self._verification_messages.copy()
+        messages[1] = {"role": "user", "content": VERIFICATION_USER_PROMPT.format(details=details, category=category)}
+        return chat_completion(self.client, self.deployment_name, messages, self.temperature)
 
 
 # ================================================================
@@ -95,9 +361,9 @@ class VDIResourceIncreaseAgent:
 # Help Desk System Coordinator: Orchestrates the entire workflow.
 # ================================================================
 class HelpDeskSystem:
-    def __init__(self, llm):
-        self.planning_agent = PlanningRoutingAgent(llm)
-        self.verification_agent = VerificationAgent(llm)
+    def __init__(self, client: AzureOpenAI, deployment_name: str, temperature: float = 0.2):
+        self.planning_agent = PlanningRoutingAgent(client, deployment_name, temperature)
+        self.verification_agent = VerificationAgent(client, deployment_name, temperature)
         self.password_reset_agent = PasswordResetAgent()
         self.vdi_agent = VDIResourceIncreaseAgent()
 
@@ -117,23 +383,62 @@ class HelpDeskSystem:
                 missing = line.split(":", 1)[1].strip()
         return category, missing
 
-    def handle_query(self, query: str) -> str:
-        # --- Step 1: Planning & Routing (Classification) ---
-        classification_response = self.planning_agent.process_query(query)
+    @staticmethod
+    def parse_classify_and_verify_response(response: str):
+        """
+        Expected response format:
+            {"category": ..., "missing": ..., "verification_outcome": ...}
+        Returns (category, missing, verification_outcome), or None if the reply is not valid JSON.
+        verification_outcome is None when the reply omits it, so the caller can fall back
+        to the VerificationAgent.
+        """
+        try:
+            result = json.loads(response)
+        except json.JSONDecodeError:
+            return None
+        if not isinstance(result, dict):
+            return None
+        missing = result.get("missing") or "None"
+        if isinstance(missing, list):
+            missing = ", ".join(str(item) for item in missing) or "None"
+        verification_outcome = result.get("verification_outcome")
+        return (
+            str(result.get("category") or "Other IT Support"),
+            str(missing),
+            str(verification_outcome) if verification_outcome else None,
+        )
+
+    def handle_query_stream(self, query: str):
+        """
+        Process the query and yield the response text in chunks; the final summary
+        is streamed as it is generated.
+        """
+        # --- Step 1: Planning & Routing (Classification + Verification in one call) ---
+        analysis_response = self.planning_agent.classify_and_verify(query)
         print("Classification Response:")
-        print(classification_response)
-        category, missing = self.parse_classification_response(classification_response)
+        print(analysis_response)
+        parsed = self.parse_classify_and_verify_response(analysis_response)
+        if parsed is None:
+            logger.warning("Could not parse combined classification reply, falling back to separate calls")
+            classification_response = self.planning_agent.process_query(query)
+            category, missing = self.parse_classification_response(classification_response)
+            verification_outcome = None
+        else:
+            category, missing, verification_outcome = parsed
 
         # If required information is missing, notify the user.
         if missing.lower() != "none":
-            return f"Missing Information: {missing}. Please provide the missing details and try again."
+            yield f"Missing Information: {missing}. Please provide the missing details and try again."
+            return
 
         # --- Step 2: Verification (Single Check) ---
-        verification_outcome = self.verification_agent.verify_request(query, category)
+        if verification_outcome is None:
+            verification_outcome = self.verification_agent.verify_request(query, category)
         print("Verification Outcome:")
         print(verification_outcome)
         if "missing" in verification_outcome.lower():
-            return f"Verification Issue: {verification_outcome}. Please provide complete details."
+            yield f"Verification Issue: {verification_outcome}. Please provide complete details."
+            return
 
         # --- Step 3: Intelligent Routing to Specialized Agent ---
         if category.lower() == "password reset":
@@ -147,41 +452,40 @@ class HelpDeskSystem:
             )
 
         # --- Step 4: Final Summary by Planning & Routing Agent ---
-        final_summary = self.planning_agent.generate_final_summary(query, category, verification_outcome, resolution)
-        return final_summary
+        yield from self.planning_agent.generate_final_summary_stream(query, category, verification_outcome, resolution)
+
+    def handle_query(self, query: str) -> str:
+        return "".join(self.handle_query_stream(query)).strip()
 
 
 # ================================================================
 # Main Application: Set up Azure OpenAI and run the help desk system.
 # ================================================================
 def main():
+    logging.basicConfig(level=logging.INFO)
+
     # Set up Azure OpenAI parameters.
     # You can either set these in your environment or replace the placeholders below.
-    azure_openai_api_base = os.environ.get("AZURE_OPENAI_API_BASE", "https://<your-resource>.openai.azure.com/")
-    azure_openai_api_version = os.environ.get("AZURE_OPENAI_API_VERSION", "2023-03-15-preview")
-    deployment_name = os.environ.get("AZURE_OPENAI_DEPLOYMENT_NAME", "your-deployment-name")
-    model_name = os.environ.get("AZURE_OPENAI_MODEL_NAME", "gpt-35-turbo")
-
-    # Initialize the Azure OpenAI Chat model via LangChain.
-    llm = AzureChatOpenAI(
-        deployment_name=deployment_name,
-        model_name=model_name,
-        temperature=0.2,
-        azure_api_base=azure_openai_api_base,
-        azure_api_version=azure_openai_api_version,
+    client = AzureOpenAI(
+        azure_endpoint=os.environ.get("AZURE_OPENAI_API_BASE", "https://<your-resource>.openai.azure.com/"),
+        api_version=os.environ.get("AZURE_OPENAI_API_VERSION", "2024-02-01"),
+        api_key=os.environ.get("AZURE_OPENAI_API_KEY", os.environ.get("OPENAI_API_KEY")),
     )
+    deployment_name = os.environ.get("AZURE_OPENAI_DEPLOYMENT_NAME", "your-deployment-name")
 
     # Create the help desk system instance.
-    help_desk = HelpDeskSystem(llm)
+    help_desk = HelpDeskSystem(client, deployment_name, temperature=0.2)
 
     print("Welcome to the Help Desk Bot powered by Azure OpenAI.")
     print("Please describe your issue below:")
     user_query = input("> ")
 
-    # Process the query through the system and display the final summary.
-    final_summary = help_desk.handle_query(user_query)
-    print("\nFinal Summary:")
-    print(final_summary)
+    # Process the query through the system and stream the final summary as it arrives.
+    for i, chunk in enumerate(help_desk.handle_query_stream(user_query)):
+        if i == 0:
+            print("\nFinal Summary:")
+        print(chunk, end="", flush=True)
+    print()
 
 
 if __name__ == "__main__":